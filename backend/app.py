@@ -1,42 +1,123 @@
 from flask import Flask, request, jsonify, send_from_directory
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import os
-import hashlib
+import asyncio
+import base64
 import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
-import json
+import multiprocessing
+import orjson
 
-from steganography import ImageSteganography
-from blockchain_client import BlockchainClient
+from steganography import ImageSteganography, hide_data_worker
+from blockchain_client import RECEIPT_WAIT_TIMEOUT_SECONDS, BlockchainClient
 from ipfs_client import IPFSClient
-from utils import allowed_file, generate_image_id, validate_image_id
+from utils import (
+    allowed_file, generate_image_id, validate_ethereum_address, validate_image_id,
+    validate_transaction_hash
+)
 
 # Build directory for frontend React build
 BUILD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend-react', 'build')
 STATIC_FOLDER = os.path.join(BUILD_DIR, 'static')
 
+class OrjsonProvider(DefaultJSONProvider):
+    """Serialize jsonify() responses and parse request bodies with orjson"""
+
+    # Dates and dataclasses go through ``default`` as with the json module
+    OPTIONS = (
+        orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        | orjson.OPT_NON_STR_KEYS
+    )
+
+    def dumps(self, obj, **kwargs):
+        orjson_kwargs = dict(kwargs)
+        default = orjson_kwargs.pop('default', self.default)
+        option = self.OPTIONS
+        if orjson_kwargs.pop('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if orjson_kwargs.pop('indent', None):
+            option |= orjson.OPT_INDENT_2
+        # orjson always writes compact UTF-8
+        orjson_kwargs.pop('separators', None)
+        orjson_kwargs.pop('ensure_ascii', None)
+        if not orjson_kwargs:
+            try:
+                return orjson.dumps(obj, default=default, option=option).decode('utf-8')
+            except TypeError:
+                # e.g. integers wider than 64 bits, which the json module handles
+                pass
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
 # Initialize Flask app and configure static folder to serve React build static assets
 app = Flask(__name__, static_folder=STATIC_FOLDER, static_url_path='/static')
+app.json = OrjsonProvider(app)
 CORS(app)
 
-# Configure upload folder
-UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
-if not os.path.exists(UPLOAD_FOLDER):
-    try:
-        os.makedirs(UPLOAD_FOLDER)
-        print(f"📁 Created uploads directory at: {UPLOAD_FOLDER}")
-    except Exception as e:
-        print(f"❌ Error creating uploads directory: {str(e)}")
-        exit(1)
-
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# Uploads are processed in memory, so there are no temporary files to clean up
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
+# Embedding and PNG encoding hold the GIL, so when the app is served through
+# wsgi.py they run in a small pool of worker processes, created on first use.
+# Workers are spawned as fresh interpreters and inherit neither this process's
+# threads nor Numba's threading layer. Running app.py directly keeps them on
+# the default thread pool, as spawned workers would re-import it as __main__
+# and rebuild every client.
+STEGO_WORKERS = int(os.getenv('STEGO_WORKERS', '2'))
+_stego_pool = None
+_stego_pool_lock = threading.Lock()
+
+def _get_stego_pool():
+    """Return the steganography process pool, or None to use threads"""
+    global _stego_pool
+    if __name__ == '__main__' or STEGO_WORKERS < 1:
+        return None
+    with _stego_pool_lock:
+        if _stego_pool is None:
+            _stego_pool = ProcessPoolExecutor(
+                max_workers=STEGO_WORKERS, mp_context=multiprocessing.get_context('spawn')
+            )
+        return _stego_pool
+
+def _reset_stego_pool(broken_pool):
+    """Drop a pool whose worker died so the next call starts a fresh one"""
+    global _stego_pool
+    with _stego_pool_lock:
+        if _stego_pool is broken_pool:
+            _stego_pool = None
+    broken_pool.shutdown(wait=False, cancel_futures=True)
+
 # Initialize clients
 stego = ImageSteganography()
 blockchain = BlockchainClient()
 ipfs = IPFSClient()
 
+# How /api/hide hands off the blockchain write (?async_mode=...):
+#   wait  - block until the transaction is mined (default)
+#   sync  - return once the node has accepted the transaction
+#   async - queue the transaction and return immediately
+HIDE_MODES = ('wait', 'sync', 'async')
+HIDE_MESSAGES = {
+    'confirmed': 'Data successfully hidden and stored on blockchain',
+    'pending': 'Data hidden; blockchain transaction submitted and awaiting confirmation',
+    'queued': 'Data hidden; blockchain record queued for submission',
+    'unknown': 'Data hidden; blockchain transaction submitted but not yet confirmed',
+}
+
+# Downloads are addressed by image ID -> IPFS hash, which never changes
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Blockchain submissions make blocking RPC calls, so they run off the event loop
+_blockchain_pool = ThreadPoolExecutor(max_workers=4)
+
 # Report IPFS configuration to console (helpful during setup)
 try:
     print(f"🔗 IPFS API URL set to: {ipfs.api_url}")
@@ -98,9 +179,16 @@ def health_check():
         }), 500
 
 @app.route('/api/hide', methods=['POST'])
-def hide_data():
+async def hide_data():
     """Hide secret data in image and store on blockchain"""
     try:
+        async_mode = request.args.get('async_mode', 'wait')
+        if async_mode not in HIDE_MODES:
+            return jsonify({
+                'success': False,
+                'error': f"Invalid async_mode, expected one of: {', '.join(HIDE_MODES)}"
+            }), 400
+
         # Validate request
         if 'image' not in request.files:
             return jsonify({'success': False, 'error': 'No image file provided'}), 400
@@ -118,45 +206,31 @@ def hide_data():
         if not secret_data:
             return jsonify({'success': False, 'error': 'No secret data provided'}), 400
         
-        # Save uploaded file with better error handling
-        filename = secrets.token_hex(8) + '_' + file.filename
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        
-        try:
-            file.save(filepath)
-            if not os.path.exists(filepath):
-                raise Exception("File failed to save")
-            print(f"📁 File saved successfully: {filepath}")
-        except Exception as e:
-            return jsonify({
-                'success': False,
-                'error': f'Failed to save uploaded file: {str(e)}'
-            }), 500
-
-        print(f"📁 File saved: {filepath}")
-        
-        # Generate secure output filename
+        # Keep the upload in memory; nothing needs to touch the disk
+        image_bytes = file.read()
         output_filename = get_secure_filename(file.filename)
-        stego_image_path = os.path.join(app.config['UPLOAD_FOLDER'], output_filename)
 
-        # Perform steganography with specific output path
+        loop = asyncio.get_running_loop()
+
+        # Perform steganography (CPU-bound, keep it off the event loop and the GIL)
         print("🔒 Performing steganography...")
-        success = stego.hide_data(filepath, secret_data, password, output_path=stego_image_path)
-        
-        if not success or not os.path.exists(stego_image_path):
+        stego_pool = _get_stego_pool()
+        try:
+            image_data = await loop.run_in_executor(
+                stego_pool, hide_data_worker, image_bytes, secret_data, password
+            )
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); replace the pool and retry once
+            print("⚠️ Steganography worker crashed, restarting the pool")
+            _reset_stego_pool(stego_pool)
+            image_data = await loop.run_in_executor(
+                _get_stego_pool(), hide_data_worker, image_bytes, secret_data, password
+            )
+        
+        if not image_data:
             raise Exception("Failed to create steganographic image")
-
-        print(f"💾 Steganographic image saved: {stego_image_path}")
-
-        # Upload steganographic image to IPFS
-        print("📡 Uploading to IPFS...")
-        with open(stego_image_path, 'rb') as f:
-            image_data = f.read()
         
-        ipfs_hash = ipfs.upload_file(image_data, f"stego_{filename}")
-        print(f"📁 IPFS hash: {ipfs_hash}")
-        
-        # Create and upload metadata
+        # Create metadata
         metadata = {
             'originalFilename': file.filename,
             'timestamp': int(datetime.now().timestamp()),
@@ -167,8 +241,14 @@ def hide_data():
             'version': '1.0'
         }
         
-        metadata_json = json.dumps(metadata)
-        metadata_hash = ipfs.upload_json(metadata)
+        # Upload steganographic image and metadata to IPFS concurrently
+        print("📡 Uploading to IPFS...")
+        async with ipfs.async_client() as client:
+            ipfs_hash, metadata_hash = await asyncio.gather(
+                ipfs.upload_file_async(image_data, output_filename, client=client),
+                ipfs.upload_json_async(metadata, client=client)
+            )
+        print(f"📁 IPFS hash: {ipfs_hash}")
         print(f"📄 Metadata hash: {metadata_hash}")
         
         # Generate unique image ID
@@ -190,8 +270,30 @@ def hide_data():
             raise Exception("Invalid image ID generated")
         
         # Store record on blockchain
-        print("⛓️ Storing on blockchain...")
-        tx_result = blockchain.store_image_record(image_id, ipfs_hash, metadata_hash)
+        print(f"⛓️ Storing on blockchain (mode: {async_mode})...")
+        if async_mode == 'async':
+            blockchain.queue_image_record(image_id, ipfs_hash, metadata_hash)
+            tx_result = {'status': 'queued'}
+        else:
+            # Only the submission needs a thread; the receipt is awaited on the
+            # event loop so waiting requests do not tie up the pool
+            submitted = await loop.run_in_executor(
+                _blockchain_pool, blockchain.submit_image_record,
+                image_id, ipfs_hash, metadata_hash
+            )
+            tx_hash_hex, receipt_future = await asyncio.wrap_future(submitted)
+            if async_mode == 'wait':
+                # Shielded so a timeout does not cancel the shared receipt future
+                try:
+                    receipt = await asyncio.wait_for(
+                        asyncio.shield(asyncio.wrap_future(receipt_future)),
+                        RECEIPT_WAIT_TIMEOUT_SECONDS
+                    )
+                    tx_result = blockchain.receipt_result(tx_hash_hex, receipt)
+                except asyncio.TimeoutError:
+                    tx_result = blockchain.receipt_timeout_result(tx_hash_hex)
+            else:
+                tx_result = {'transaction_hash': tx_hash_hex, 'status': 'pending'}
         
         return jsonify({
             'success': True,
@@ -199,10 +301,12 @@ def hide_data():
             'ipfsHash': ipfs_hash,
             'metadataHash': metadata_hash,
             'transactionHash': tx_result.get('transaction_hash', 'N/A'),
+            'transactionStatus': tx_result.get('status', 'confirmed'),
             'blockNumber': tx_result.get('block_number', 'N/A'),
             'gasUsed': tx_result.get('gas_used', 'N/A'),
             'downloadUrl': f'/api/download/{image_id}',
-            'message': 'Data successfully hidden and stored on blockchain'
+            'statusUrl': f'/api/status/{image_id}',
+            'message': HIDE_MESSAGES[tx_result['status']]
         })
         
     except Exception as e:
@@ -211,16 +315,9 @@ def hide_data():
             'success': False,
             'error': f'Processing failed: {str(e)}'
         }), 500
-    finally:
-        # Only cleanup the input file, keep the output file
-        try:
-            if 'filepath' in locals() and os.path.exists(filepath):
-                os.remove(filepath)
-        except Exception as e:
-            print(f"⚠️ Cleanup error: {str(e)}")
 
 @app.route('/api/extract', methods=['POST'])
-def extract_data():
+async def extract_data():
     """Extract secret data from blockchain and IPFS OR directly from an uploaded stego image"""
     try:
         # If a file is uploaded (multipart/form-data), extract directly from it
@@ -234,35 +331,19 @@ def extract_data():
             if not allowed_file(file.filename):
                 return jsonify({'success': False, 'error': 'Invalid file type'}), 400
 
-            filename = secrets.token_hex(8) + '_' + file.filename
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-
-            try:
-                file.save(filepath)
-                if not os.path.exists(filepath):
-                    raise Exception("File failed to save")
-                print(f"📁 Uploaded stego file saved: {filepath}")
-            except Exception as e:
-                return jsonify({
-                    'success': False,
-                    'error': f'Failed to save uploaded file: {str(e)}'
-                }), 500
-
-            try:
-                print("🔓 Extracting hidden data from uploaded file...")
-                extracted_data = stego.extract_data(filepath, password)
-                metadata = {
-                    'owner': None,
-                    'timestamp': None,
-                    'originalFilename': file.filename,
-                    'fileSize': os.path.getsize(filepath),
-                    'hasPassword': bool(password)
-                }
-            finally:
-                try:
-                    os.remove(filepath)
-                except Exception as e:
-                    print(f"⚠️ Cleanup error after extraction: {e}")
+            image_bytes = file.read()
+
+            print("🔓 Extracting hidden data from uploaded file...")
+            extracted_data = await asyncio.get_running_loop().run_in_executor(
+                None, stego.extract_data, image_bytes, password
+            )
+            metadata = {
+                'owner': None,
+                'timestamp': None,
+                'originalFilename': file.filename,
+                'fileSize': len(image_bytes),
+                'hasPassword': bool(password)
+            }
 
             return jsonify({
                 'success': True,
@@ -281,35 +362,36 @@ def extract_data():
         if not validate_image_id(image_id):
             return jsonify({'success': False, 'error': 'Invalid Image ID format'}), 400
         
+        loop = asyncio.get_running_loop()
+
         # Get record from blockchain
         print(f"🔍 Retrieving record for image ID: {image_id}")
-        record = blockchain.get_image_record(image_id)
+        record = await loop.run_in_executor(None, blockchain.get_image_record, image_id)
         
-        # Download image from IPFS
+        # Download image and metadata from IPFS concurrently
         print(f"📡 Downloading from IPFS: {record['ipfs_hash']}")
-        image_data = ipfs.download_file(record['ipfs_hash'])
-        
-        # Save image temporarily
-        temp_filename = f"temp_{secrets.token_hex(8)}.png"
-        temp_path = os.path.join(app.config['UPLOAD_FOLDER'], temp_filename)
-        
-        safe_file_operations(temp_path, 'wb', image_data)
+        async with ipfs.async_client() as client:
+            image_data, metadata_content = await asyncio.gather(
+                ipfs.download_file_async(record['ipfs_hash'], client=client),
+                ipfs.download_file_async(record['metadata_hash'], client=client),
+                return_exceptions=True
+            )
+        if isinstance(image_data, Exception):
+            raise image_data
         
         # Extract hidden data
         print("🔓 Extracting hidden data...")
-        extracted_data = stego.extract_data(temp_path, password)
+        extracted_data = await loop.run_in_executor(None, stego.extract_data, image_data, password)
         
-        # Download metadata
+        # Parse metadata
         try:
-            metadata_content = ipfs.download_file(record['metadata_hash'])
-            metadata = json.loads(metadata_content.decode('utf-8'))
+            if isinstance(metadata_content, Exception):
+                raise metadata_content
+            metadata = orjson.loads(metadata_content)
         except Exception as e:
             print(f"⚠️ Could not load metadata: {e}")
             metadata = {}
         
-        # Cleanup
-        os.remove(temp_path)
-        
         return jsonify({
             'success': True,
             'data': extracted_data,
@@ -347,7 +429,7 @@ def verify_ownership():
         if not validate_image_id(image_id):
             return jsonify({'success': False, 'error': 'Invalid Image ID format'}), 400
         
-        if not user_address.startswith('0x') or len(user_address) != 42:
+        if not validate_ethereum_address(user_address):
             return jsonify({'success': False, 'error': 'Invalid Ethereum address format'}), 400
         
         # Get record and verify ownership
@@ -378,7 +460,7 @@ def verify_ownership():
 def get_user_images(address):
     """Get all images for a user"""
     try:
-        if not address.startswith('0x') or len(address) != 42:
+        if not validate_ethereum_address(address):
             return jsonify({'success': False, 'error': 'Invalid address format'}), 400
         
         image_ids = blockchain.get_user_images(address)
@@ -395,6 +477,54 @@ def get_user_images(address):
             'error': str(e)
         }), 500
 
+@app.route('/api/tx/<tx_hash>', methods=['GET'])
+def get_transaction_status(tx_hash):
+    """Poll the status of a blockchain transaction submitted by /api/hide"""
+    try:
+        if not validate_transaction_hash(tx_hash):
+            return jsonify({'success': False, 'error': 'Invalid transaction hash format'}), 400
+        
+        tx_status = blockchain.get_tx_status(tx_hash)
+        
+        return jsonify({
+            'success': True,
+            'transactionHash': tx_status['transaction_hash'],
+            'status': tx_status['status'],
+            'blockNumber': tx_status.get('block_number'),
+            'gasUsed': tx_status.get('gas_used')
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/status/<image_id>', methods=['GET'])
+def get_record_status(image_id):
+    """Poll the blockchain status of a record stored by /api/hide"""
+    try:
+        if not validate_image_id(image_id):
+            return jsonify({'success': False, 'error': 'Invalid Image ID format'}), 400
+        
+        record_status = blockchain.get_record_status(image_id)
+        
+        return jsonify({
+            'success': True,
+            'imageId': image_id,
+            'status': record_status['status'],
+            'transactionHash': record_status.get('transaction_hash'),
+            'blockNumber': record_status.get('block_number'),
+            'gasUsed': record_status.get('gas_used'),
+            'error': record_status.get('error')
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/download/<image_id>', methods=['GET'])
 def download_steganographic_image(image_id):
     """Download steganographic image from IPFS"""
@@ -410,20 +540,33 @@ def download_steganographic_image(image_id):
         if not record['exists']:
             return jsonify({'success': False, 'error': 'Image not found'}), 404
         
-        # Download image from IPFS
+        # The IPFS hash identifies the content, so it doubles as a strong ETag
+        # and the image can be cached indefinitely. If-None-Match uses weak
+        # comparison, so proxies that weaken the ETag still get a 304
+        from flask import Response
+        if request.if_none_match.contains_weak(record['ipfs_hash']):
+            response = Response(status=304)
+            response.set_etag(record['ipfs_hash'])
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+            return response
+        
+        # Stream image from IPFS straight to the client
         print(f"📡 Downloading from IPFS: {record['ipfs_hash']}")
-        image_data = ipfs.download_file(record['ipfs_hash'])
+        image_stream = ipfs.download_file_stream(record['ipfs_hash'])
         
         # Create response with image data
-        from flask import Response
-        return Response(
-            image_data,
+        response = Response(
+            image_stream,
             mimetype='image/png',
+            direct_passthrough=True,
             headers={
                 'Content-Disposition': f'attachment; filename="steganographic_{image_id}.png"',
-                'Content-Type': 'image/png'
+                'Content-Type': 'image/png',
+                'Cache-Control': IMMUTABLE_CACHE_CONTROL
             }
         )
+        response.set_etag(record['ipfs_hash'])
+        return response
         
     except Exception as e:
         print(f"❌ Error in download_steganographic_image: {str(e)}")
@@ -432,26 +575,11 @@ def download_steganographic_image(image_id):
             'error': f'Download failed: {str(e)}'
         }), 500
 
-def safe_file_operations(filepath, mode='wb', data=None):
-    """Safely handle file operations with proper error handling"""
-    try:
-        with open(filepath, mode) as f:
-            if data:
-                if isinstance(data, bytes):
-                    f.write(data)
-                else:
-                    f.write(data.encode('utf-8'))
-            return True
-    except Exception as e:
-        print(f"❌ File operation failed: {str(e)}")
-        return False
-
 def get_secure_filename(original_filename):
-    """Generate a secure filename with timestamp"""
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    random_hex = secrets.token_hex(4)
-    name, ext = os.path.splitext(original_filename)
-    return f"stego_{timestamp}_{random_hex}{ext}"
+    """Generate a secure, unique filename keeping the original extension"""
+    token = base64.urlsafe_b64encode(secrets.token_bytes(12)).decode('ascii')
+    ext = os.path.splitext(original_filename)[1]
+    return f"stego_{token}{ext}"
 
 if __name__ == '__main__':
     print("🚀 Starting Blockchain Steganography Server...")
@@ -1,17 +1,74 @@
-from web3 import Web3
+import requests
+from cachetools import TTLCache
+from eth_abi import decode, encode
+from eth_utils import function_signature_to_4byte_selector
+from requests.adapters import HTTPAdapter
+from web3 import AsyncWeb3, Web3, WebSocketProvider
+from web3.datastructures import AttributeDict
+from web3.exceptions import TransactionNotFound
+import asyncio
 import json
 import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import lru_cache
 from datetime import datetime
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Upper bound on transactions whose receipt status is kept in memory
+MAX_TRACKED_TRANSACTIONS = 1024
+
+# How long to wait for a receipt before giving up on a transaction
+RECEIPT_TIMEOUT_SECONDS = 120
+
+# Callers blocked on a receipt give up a little later, in case the background
+# wait itself stalls on a dead socket
+RECEIPT_WAIT_TIMEOUT_SECONDS = RECEIPT_TIMEOUT_SECONDS + 15
+
+# Pause before reconnecting a dropped WebSocket block subscription
+WS_RECONNECT_DELAY_SECONDS = 30
+
+# Gas limit used when estimation fails, per stored record
+DEFAULT_GAS_PER_RECORD = 200000
+
+# Sepolia gas price is stable over a few seconds; share it across requests
+GAS_PRICE_TTL_SECONDS = 5
+
+# Stored records never change once written, so reads can be cached
+RECORD_CACHE_SIZE = 1024
+RECORD_CACHE_TTL_SECONDS = 3600
+
+# Argument types of the contract functions we send transactions to; calldata
+# for these is encoded directly instead of through ContractFunction objects
+WRITE_FUNCTION_TYPES = {
+    'storeImageRecord': ['string', 'string', 'string'],
+    'storeImageRecordBatch': ['string[]', 'string[]', 'string[]'],
+}
+
+# getImageRecord is read on every extract/download; it is called with raw
+# eth_call data and its result decoded directly
+GET_RECORD_SIGNATURE = 'getImageRecord(string)'
+IMAGE_RECORD_TYPE = '(string,string,uint256,address,bool)'
+
+@lru_cache(maxsize=4096)
+def _checksum(address):
+    """EIP-55 checksum an address; callers reuse the same wallets repeatedly"""
+    return Web3.to_checksum_address(address)
+
 class BlockchainClient:
     def __init__(self):
         # Initialize Web3 connection
         # Use Sepolia network with your Infura credentials
-        infura_url = f"https://sepolia.infura.io/v3/{os.getenv('INFURA_PROJECT_ID')}"
-        self.w3 = Web3(Web3.HTTPProvider(infura_url))
+        infura_project_id = os.getenv('INFURA_PROJECT_ID')
+        infura_url = f"https://sepolia.infura.io/v3/{infura_project_id}"
+        # Share one pooled, keep-alive session across all RPC calls
+        session = requests.Session()
+        session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=32))
+        self.w3 = Web3(Web3.HTTPProvider(infura_url, session=session))
         
         # Contract configuration
         self.contract_address = os.getenv('CONTRACT_ADDRESS', '0xA44241DCe6A3D340741CE15d3cd8E22fC2e927cE')
@@ -41,6 +98,17 @@ class BlockchainClient:
                 "stateMutability": "nonpayable",
                 "type": "function"
             },
+            {
+                "inputs": [
+                    {"name": "imageIds", "type": "string[]"},
+                    {"name": "ipfsHashes", "type": "string[]"},
+                    {"name": "metadataHashes", "type": "string[]"}
+                ],
+                "name": "storeImageRecordBatch",
+                "outputs": [],
+                "stateMutability": "nonpayable",
+                "type": "function"
+            },
             {
                 "inputs": [{"name": "imageId", "type": "string"}],
                 "name": "getImageRecord",
@@ -102,100 +170,499 @@ class BlockchainClient:
         else:
             self.account = None
             print("⚠️ Private key not configured")
+        
+        # Function selectors are fixed by the ABI; the chain id is read once
+        self._selectors = {
+            fn_name: function_signature_to_4byte_selector(f"{fn_name}({','.join(types)})")
+            for fn_name, types in WRITE_FUNCTION_TYPES.items()
+        }
+        self._get_record_selector = function_signature_to_4byte_selector(GET_RECORD_SIGNATURE)
+        self._chain_id = None
+        
+        # Optimistic nonce counter: primed once, then incremented locally per transaction
+        self._nonce_lock = threading.Lock()
+        self._next_nonce = None
+        if self.account:
+            try:
+                self._next_nonce = self.w3.eth.get_transaction_count(self.account.address, 'pending')
+            except Exception as e:
+                print(f"⚠️ Could not prime nonce: {e}")
+        
+        # Cache of image records already read from the chain
+        self._record_cache = TTLCache(maxsize=RECORD_CACHE_SIZE, ttl=RECORD_CACHE_TTL_SECONDS)
+        self._record_cache_lock = threading.RLock()
+        
+        # Short-lived gas price cache
+        self._gas_price_lock = threading.Lock()
+        self._gas_price = None
+        self._gas_price_expires = 0
+        
+        # Receipts are awaited in the background; results are kept by transaction hash
+        self._receipt_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='tx-receipt')
+        self._tx_lock = threading.Lock()
+        self._tx_status = {}
+        
+        # Records queued with queue_image_record are submitted in the background;
+        # their progress is kept by image ID until a transaction hash exists
+        self._queue_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='tx-queue')
+        self._record_status = {}
+        
+        # While a WebSocket newHeads subscription is live, pending receipts are
+        # checked in one batch per block instead of being polled per transaction
+        self._pending_lock = threading.Lock()
+        self._pending_receipts = {}
+        self._heads_subscribed = threading.Event()
+        ws_url = os.getenv('INFURA_WS_URL')
+        if not ws_url and infura_project_id:
+            ws_url = f"wss://sepolia.infura.io/ws/v3/{infura_project_id}"
+        if ws_url:
+            threading.Thread(
+                target=self._run_head_watcher, args=(ws_url,), name='block-heads', daemon=True
+            ).start()
+        
+        # Optional batching: records arriving within the window share one
+        # storeImageRecordBatch transaction (requires a contract that has it)
+        self._batch_window = int(os.getenv('BLOCKCHAIN_BATCH_WINDOW_MS', '0')) / 1000
+        self._batch_max_size = int(os.getenv('BLOCKCHAIN_BATCH_MAX_SIZE', '20'))
+        self._pending = queue.Queue()
+        if self._batch_window > 0:
+            threading.Thread(target=self._batch_worker, name='tx-batcher', daemon=True).start()
+            print(f"📦 Batching records every {self._batch_window * 1000:.0f}ms (max {self._batch_max_size})")
     
-    def check_connection(self):
-        """Check blockchain connection"""
-        try:
-            return self.w3.is_connected() and self.contract is not None
-        except:
-            return False
+    def _reserve_nonce(self):
+        """Hand out the next nonce without an RPC round trip"""
+        with self._nonce_lock:
+            if self._next_nonce is None:
+                self._next_nonce = self.w3.eth.get_transaction_count(self.account.address, 'pending')
+            nonce = self._next_nonce
+            self._next_nonce += 1
+            return nonce
+    
+    def _reset_nonce(self):
+        """Resynchronise the nonce counter with the node after a failed send"""
+        with self._nonce_lock:
+            try:
+                self._next_nonce = self.w3.eth.get_transaction_count(self.account.address, 'pending')
+            except Exception as e:
+                print(f"⚠️ Could not resync nonce: {e}")
+                self._next_nonce = None
     
-    def store_image_record(self, image_id, ipfs_hash, metadata_hash):
-        """Store image record on blockchain"""
+    def _set_tx_status(self, tx_hash_hex, status):
+        with self._tx_lock:
+            self._tx_status.pop(tx_hash_hex, None)
+            self._tx_status[tx_hash_hex] = status
+            while len(self._tx_status) > MAX_TRACKED_TRANSACTIONS:
+                self._tx_status.pop(next(iter(self._tx_status)))
+    
+    def _set_record_status(self, image_id, status):
+        with self._tx_lock:
+            self._record_status.pop(image_id, None)
+            self._record_status[image_id] = status
+            while len(self._record_status) > MAX_TRACKED_TRANSACTIONS:
+                self._record_status.pop(next(iter(self._record_status)))
+    
+    def _record_receipt(self, tx_hash_hex, receipt):
+        self._set_tx_status(tx_hash_hex, {
+            'status': 'confirmed' if receipt.status == 1 else 'failed',
+            'block_number': receipt.blockNumber,
+            'gas_used': receipt.gasUsed
+        })
+    
+    def _wait_for_receipt(self, tx_hash, tx_hash_hex):
+        """Wait for a transaction to be mined and record its outcome"""
         try:
-            if not self.contract or not self.account:
-                raise Exception("Blockchain client not properly configured")
-            
-            print(f"📝 Storing record: {image_id}")
-            
-            # Check if image already exists
+            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=RECEIPT_TIMEOUT_SECONDS)
+        except Exception as e:
+            self._set_tx_status(tx_hash_hex, {'status': 'unknown', 'error': str(e)})
+            raise
+        
+        self._record_receipt(tx_hash_hex, receipt)
+        return receipt
+    
+    def _track_receipt(self, tx_hash, tx_hash_hex):
+        """Start waiting for a receipt in the background and return its future"""
+        self._set_tx_status(tx_hash_hex, {'status': 'pending'})
+        with self._pending_lock:
+            if self._heads_subscribed.is_set():
+                future = Future()
+                self._pending_receipts[tx_hash_hex] = (future, time.monotonic())
+                return future
+        return self._receipt_pool.submit(self._wait_for_receipt, tx_hash, tx_hash_hex)
+    
+    def _run_head_watcher(self, ws_url):
+        """Thread entry point for the WebSocket block subscription"""
+        asyncio.run(self._watch_heads(ws_url))
+    
+    async def _watch_heads(self, ws_url):
+        """Check pending receipts on every new block, reconnecting when the socket drops"""
+        while True:
             try:
-                existing_record = self.contract.functions.getImageRecord(image_id).call()
-                if existing_record[4]:  # exists field
-                    print(f"⚠️ Image ID already exists: {image_id}")
-                    # Generate a new unique ID
-                    import time
-                    import secrets
-                    timestamp = int(time.time())
-                    random_hex = secrets.token_hex(8)
-                    image_id = f"IMG-{timestamp}-{random_hex}"
-                    print(f"🔄 Generated new ID: {image_id}")
+                async with AsyncWeb3(WebSocketProvider(ws_url)) as w3_ws:
+                    await w3_ws.eth.subscribe('newHeads')
+                    self._heads_subscribed.set()
+                    print("🔔 Subscribed to new blocks over WebSocket")
+                    async for _ in w3_ws.socket.process_subscriptions():
+                        await asyncio.to_thread(self._check_pending_receipts)
             except Exception as e:
-                print(f"🔍 Image ID check: {e}")
+                print(f"⚠️ Block subscription unavailable: {e}")
             
-            # Get current account info
-            nonce = self.w3.eth.get_transaction_count(self.account.address)
-            gas_price = self.w3.eth.gas_price
-            balance = self.w3.eth.get_balance(self.account.address)
+            self._poll_pending_receipts()
+            await asyncio.sleep(WS_RECONNECT_DELAY_SECONDS)
+    
+    def _check_pending_receipts(self):
+        """Fetch receipts for every pending transaction in a single batch request"""
+        with self._pending_lock:
+            pending = list(self._pending_receipts.items())
+        if not pending:
+            return
+        
+        try:
+            responses = self.w3.provider.make_batch_request([
+                ('eth_getTransactionReceipt', ['0x' + tx_hash_hex]) for tx_hash_hex, _ in pending
+            ])
+        except Exception as e:
+            print(f"⚠️ Receipt check failed: {e}")
+            return
+        if not isinstance(responses, list):
+            print(f"⚠️ Receipt check failed: {responses.get('error')}")
+            return
+        
+        now = time.monotonic()
+        for (tx_hash_hex, (future, submitted_at)), response in zip(pending, responses):
+            raw_receipt = response.get('result')
+            if raw_receipt is None and now - submitted_at < RECEIPT_TIMEOUT_SECONDS:
+                continue
             
-            print(f"🔍 Account: {self.account.address}")
-            print(f"🔍 Nonce: {nonce}")
-            print(f"🔍 Gas Price: {gas_price}")
-            print(f"🔍 Balance: {self.w3.from_wei(balance, 'ether')} ETH")
-            print(f"🔍 Contract Address: {self.contract_address}")
+            with self._pending_lock:
+                self._pending_receipts.pop(tx_hash_hex, None)
+            
+            if raw_receipt is None:
+                error = f"Transaction {tx_hash_hex} not mined after {RECEIPT_TIMEOUT_SECONDS} seconds"
+                self._set_tx_status(tx_hash_hex, {'status': 'unknown', 'error': error})
+                future.set_exception(Exception(error))
+                continue
             
-            # Estimate gas for the transaction
             try:
-                gas_estimate = self.contract.functions.storeImageRecord(
-                    image_id, ipfs_hash, metadata_hash
-                ).estimate_gas({'from': self.account.address})
-                print(f"🔍 Estimated gas: {gas_estimate}")
-                gas_limit = int(gas_estimate * 1.2)  # Add 20% buffer
+                receipt = AttributeDict({
+                    'transactionHash': tx_hash_hex,
+                    'status': int(raw_receipt['status'], 16),
+                    'blockNumber': int(raw_receipt['blockNumber'], 16),
+                    'gasUsed': int(raw_receipt['gasUsed'], 16)
+                })
             except Exception as e:
-                print(f"⚠️ Gas estimation failed: {e}")
-                gas_limit = 200000  # Use default
+                self._set_tx_status(tx_hash_hex, {'status': 'unknown', 'error': str(e)})
+                future.set_exception(Exception(f"Malformed receipt for {tx_hash_hex}: {e}"))
+                continue
             
+            self._record_receipt(tx_hash_hex, receipt)
+            future.set_result(receipt)
+    
+    def _poll_pending_receipts(self):
+        """Hand receipts awaited through the subscription back to per-transaction polling"""
+        with self._pending_lock:
+            self._heads_subscribed.clear()
+            pending, self._pending_receipts = self._pending_receipts, {}
+        
+        for tx_hash_hex, (future, _) in pending.items():
+            poll_future = self._receipt_pool.submit(self._wait_for_receipt, '0x' + tx_hash_hex, tx_hash_hex)
+            poll_future.add_done_callback(lambda done, target=future: (
+                target.set_exception(done.exception()) if done.exception()
+                else target.set_result(done.result())
+            ))
+    
+    def _batch_worker(self):
+        """Collect queued records for up to one batch window and submit them together"""
+        while True:
+            batch = [self._pending.get()]
+            deadline = time.monotonic() + self._batch_window
+            while len(batch) < self._batch_max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._submit_batch(batch)
+    
+    def _submit_batch(self, batch):
+        """Send one transaction for a batch of records and resolve every caller's future"""
+        image_ids, ipfs_hashes, metadata_hashes, futures = (list(column) for column in zip(*batch))
+        try:
+            if len(batch) == 1:
+                fn_name = 'storeImageRecord'
+                args = [image_ids[0], ipfs_hashes[0], metadata_hashes[0]]
+            else:
+                print(f"📦 Submitting batch of {len(batch)} records")
+                fn_name = 'storeImageRecordBatch'
+                args = [image_ids, ipfs_hashes, metadata_hashes]
+            result = self._send_transaction(fn_name, args, DEFAULT_GAS_PER_RECORD * len(batch))
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        
+        for future in futures:
+            future.set_result(result)
+    
+    def _get_cached_gas_price(self):
+        with self._gas_price_lock:
+            if time.monotonic() < self._gas_price_expires:
+                return self._gas_price
+            return None
+    
+    def _cache_gas_price(self, gas_price):
+        with self._gas_price_lock:
+            self._gas_price = gas_price
+            self._gas_price_expires = time.monotonic() + GAS_PRICE_TTL_SECONDS
+    
+    def _encode_call(self, fn_name, args):
+        """ABI-encode calldata for a write function using its precomputed selector"""
+        return self._selectors[fn_name] + encode(WRITE_FUNCTION_TYPES[fn_name], args)
+    
+    def _call_get_image_record(self, image_id):
+        """Call getImageRecord and return (ipfsHash, metadataHash, timestamp, owner, exists)"""
+        data = self._get_record_selector + encode(['string'], [image_id])
+        result = self.w3.eth.call({'to': self.contract.address, 'data': data})
+        ipfs_hash, metadata_hash, timestamp, owner, exists = decode([IMAGE_RECORD_TYPE], result)[0]
+        return ipfs_hash, metadata_hash, timestamp, _checksum(owner), exists
+    
+    def _send_transaction(self, fn_name, args, default_gas):
+        """Estimate, sign and broadcast a contract call; returns (tx hash, receipt future)"""
+        print(f"🔍 Account: {self.account.address}")
+        print(f"🔍 Contract Address: {self.contract_address}")
+        
+        data = self._encode_call(fn_name, args)
+        estimate_fields = {
+            'from': self.account.address,
+            'to': self.contract.address,
+            'data': data
+        }
+        
+        # Fetch gas price and estimate gas in a single JSON-RPC batch when the
+        # cached gas price has expired
+        gas_price = self._get_cached_gas_price()
+        try:
+            if gas_price is None:
+                with self.w3.batch_requests() as batch:
+                    batch.add(self.w3.eth.gas_price)
+                    batch.add(self.w3.eth.estimate_gas(estimate_fields))
+                    gas_price, gas_estimate = batch.execute()
+                self._cache_gas_price(gas_price)
+            else:
+                gas_estimate = self.w3.eth.estimate_gas(estimate_fields)
+            print(f"🔍 Estimated gas: {gas_estimate}")
+            gas_limit = int(gas_estimate * 1.2)  # Add 20% buffer
+        except Exception as e:
+            print(f"⚠️ Gas estimation failed: {e}")
+            gas_limit = default_gas  # Use default
+        
+        if gas_price is None:
+            gas_price = self.w3.eth.gas_price
+            self._cache_gas_price(gas_price)
+        print(f"🔍 Gas Price: {gas_price}")
+        
+        if self._chain_id is None:
+            self._chain_id = self.w3.eth.chain_id
+        
+        nonce = self._reserve_nonce()
+        print(f"🔍 Nonce: {nonce}")
+        
+        try:
             # Build transaction
-            transaction = self.contract.functions.storeImageRecord(
-                image_id, ipfs_hash, metadata_hash
-            ).build_transaction({
-                'from': self.account.address,
+            transaction = {
+                'chainId': self._chain_id,
+                'to': self.contract.address,
+                'data': data,
+                'value': 0,
                 'nonce': nonce,
                 'gas': gas_limit,
                 'gasPrice': gas_price
-            })
+            }
             
             # Sign transaction
             signed_txn = self.w3.eth.account.sign_transaction(transaction, self.private_key)
             
             # Send transaction
             tx_hash = self.w3.eth.send_raw_transaction(signed_txn.raw_transaction)
-            tx_hash_hex = tx_hash.hex()
-            
-            print(f"📤 Transaction sent: {tx_hash_hex}")
-            
-            # Wait for confirmation
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
-            
-            print(f"🔍 Transaction receipt status: {receipt.status}")
-            print(f"🔍 Gas used: {receipt.gasUsed}")
-            print(f"🔍 Block number: {receipt.blockNumber}")
+        except Exception:
+            # The reserved nonce may never have reached the node
+            self._reset_nonce()
+            raise
+        
+        tx_hash_hex = tx_hash.hex()
+        
+        print(f"📤 Transaction sent: {tx_hash_hex}")
+        
+        return tx_hash_hex, self._track_receipt(tx_hash, tx_hash_hex)
+    
+    def get_tx_status(self, tx_hash):
+        """Get the status of a submitted transaction (pending/confirmed/failed/unknown)"""
+        tx_hash_hex = tx_hash[2:] if tx_hash.startswith('0x') else tx_hash
+        tx_hash_hex = tx_hash_hex.lower()
+        
+        with self._tx_lock:
+            status = self._tx_status.get(tx_hash_hex)
+        if status is not None:
+            return dict(status, transaction_hash=tx_hash_hex)
+        
+        # Not submitted by this process (or evicted): ask the node
+        try:
+            receipt = self.w3.eth.get_transaction_receipt('0x' + tx_hash_hex)
+        except TransactionNotFound:
+            return {'transaction_hash': tx_hash_hex, 'status': 'unknown'}
+        except Exception as e:
+            raise Exception(f"Failed to get transaction status: {str(e)}")
+        
+        return {
+            'transaction_hash': tx_hash_hex,
+            'status': 'confirmed' if receipt.status == 1 else 'failed',
+            'block_number': receipt.blockNumber,
+            'gas_used': receipt.gasUsed
+        }
+    
+    def check_connection(self):
+        """Check blockchain connection"""
+        try:
+            return self.w3.is_connected() and self.contract is not None
+        except:
+            return False
+    
+    def submit_image_record(self, image_id, ipfs_hash, metadata_hash):
+        """Send an image record without waiting for it to be mined
+
+        Returns a future resolving to ``(tx_hash_hex, receipt_future)``. With
+        batching enabled the record is only queued, and the future resolves
+        once its batch has been sent. Progress is tracked under the given
+        image ID for ``get_record_status``.
+        """
+        if not self.contract or not self.account:
+            raise Exception("Blockchain client not properly configured")
+        
+        print(f"📝 Storing record: {image_id}")
+        record_id = image_id
+        
+        # Check if image already exists
+        try:
+            existing_record = self._call_get_image_record(image_id)
+            if existing_record[4]:  # exists field
+                print(f"⚠️ Image ID already exists: {image_id}")
+                # Generate a new unique ID
+                import secrets
+                timestamp = int(time.time())
+                random_hex = secrets.token_hex(8)
+                image_id = f"IMG-{timestamp}-{random_hex}"
+                print(f"🔄 Generated new ID: {image_id}")
+        except Exception as e:
+            print(f"🔍 Image ID check: {e}")
+        
+        self._set_record_status(record_id, {'status': 'queued'})
+        future = Future()
+        future.add_done_callback(lambda f: self._record_submitted(record_id, f))
+        if self._batch_window > 0:
+            self._pending.put((image_id, ipfs_hash, metadata_hash, future))
+        else:
+            try:
+                future.set_result(self._send_transaction(
+                    'storeImageRecord', [image_id, ipfs_hash, metadata_hash], DEFAULT_GAS_PER_RECORD
+                ))
+            except Exception as e:
+                future.set_exception(e)
+        return future
+    
+    def _record_submitted(self, image_id, future):
+        """Note the transaction (or the failure) behind a submitted record"""
+        error = future.exception()
+        if error is not None:
+            self._set_record_status(image_id, {'status': 'failed', 'error': str(error)})
+        else:
+            self._set_record_status(image_id, {'transaction_hash': future.result()[0]})
+    
+    def receipt_result(self, tx_hash_hex, receipt):
+        """Turn the receipt of a stored record into a result, raising if it reverted"""
+        print(f"🔍 Transaction receipt status: {receipt.status}")
+        print(f"🔍 Gas used: {receipt.gasUsed}")
+        print(f"🔍 Block number: {receipt.blockNumber}")
+        
+        if receipt.status == 1:
+            print(f"✅ Transaction confirmed in block: {receipt.blockNumber}")
+            return {
+                'transaction_hash': tx_hash_hex,
+                'block_number': receipt.blockNumber,
+                'gas_used': receipt.gasUsed,
+                'status': 'confirmed'
+            }
+        
+        # Get more details about the failure
+        try:
+            tx = self.w3.eth.get_transaction('0x' + tx_hash_hex)
+            print(f"🔍 Transaction details: {tx}")
+        except Exception as e:
+            print(f"🔍 Could not get transaction details: {e}")
+        raise Exception(f"Transaction failed with status: {receipt.status}")
+    
+    def _store_queued_record(self, image_id, ipfs_hash, metadata_hash):
+        """Submit a record queued by queue_image_record, noting failures to send it"""
+        try:
+            tx_result = self.store_image_record(image_id, ipfs_hash, metadata_hash)
+        except Exception as e:
+            print(f"❌ Background blockchain storage failed for {image_id}: {str(e)}")
+            self._set_record_status(image_id, {'status': 'failed', 'error': str(e)})
+            return
+        
+        print(f"⛓️ Queued record {image_id} sent: {tx_result['transaction_hash']}")
+    
+    def queue_image_record(self, image_id, ipfs_hash, metadata_hash):
+        """Store an image record in the background; follow it with ``get_record_status``"""
+        self._set_record_status(image_id, {'status': 'queued'})
+        self._queue_pool.submit(self._store_queued_record, image_id, ipfs_hash, metadata_hash)
+    
+    def get_record_status(self, image_id):
+        """Get the status of a stored record (queued/pending/confirmed/failed/unknown)"""
+        with self._tx_lock:
+            status = self._record_status.get(image_id)
+        if status is None:
+            return {'image_id': image_id, 'status': 'unknown'}
+        
+        # Once sent, the record follows its transaction
+        if 'transaction_hash' in status:
+            return dict(self.get_tx_status(status['transaction_hash']), image_id=image_id)
+        return dict(status, image_id=image_id)
+    
+    def receipt_timeout_result(self, tx_hash_hex):
+        """Result for a transaction whose receipt never arrived"""
+        error = f"No receipt for {tx_hash_hex} after {RECEIPT_WAIT_TIMEOUT_SECONDS} seconds"
+        print(f"⚠️ {error}")
+        self._set_tx_status(tx_hash_hex, {'status': 'unknown', 'error': error})
+        return {
+            'transaction_hash': tx_hash_hex,
+            'status': 'unknown'
+        }
+    
+    def store_image_record(self, image_id, ipfs_hash, metadata_hash, wait=False):
+        """Store image record on blockchain
+
+        By default the call returns as soon as the node has accepted the
+        transaction; the receipt is awaited in the background and can be
+        polled with ``get_tx_status``. Pass ``wait=True`` to block until mined.
+        """
+        try:
+            tx_hash_hex, receipt_future = self.submit_image_record(
+                image_id, ipfs_hash, metadata_hash
+            ).result()
             
-            if receipt.status == 1:
-                print(f"✅ Transaction confirmed in block: {receipt.blockNumber}")
+            if not wait:
                 return {
                     'transaction_hash': tx_hash_hex,
-                    'block_number': receipt.blockNumber,
-                    'gas_used': receipt.gasUsed
+                    'status': 'pending'
                 }
-            else:
-                # Get more details about the failure
-                try:
-                    tx = self.w3.eth.get_transaction(tx_hash)
-                    print(f"🔍 Transaction details: {tx}")
-                except Exception as e:
-                    print(f"🔍 Could not get transaction details: {e}")
-                raise Exception(f"Transaction failed with status: {receipt.status}")
+            
+            # Wait for confirmation
+            try:
+                receipt = receipt_future.result(timeout=RECEIPT_WAIT_TIMEOUT_SECONDS)
+            except FutureTimeoutError:
+                return self.receipt_timeout_result(tx_hash_hex)
+            return self.receipt_result(tx_hash_hex, receipt)
                 
         except Exception as e:
             raise Exception(f"Blockchain storage failed: {str(e)}")
@@ -206,11 +673,16 @@ class BlockchainClient:
             if not self.contract:
                 raise Exception("Contract not configured")
             
+            with self._record_cache_lock:
+                cached = self._record_cache.get(image_id)
+            if cached is not None:
+                return dict(cached)
+            
             print(f"🔍 Retrieving record: {image_id}")
             
-            result = self.contract.functions.getImageRecord(image_id).call()
+            result = self._call_get_image_record(image_id)
             
-            return {
+            record = {
                 'ipfs_hash': result[0],
                 'metadata_hash': result[1],
                 'timestamp': result[2],
@@ -218,6 +690,12 @@ class BlockchainClient:
                 'exists': result[4]
             }
             
+            if record['exists']:
+                with self._record_cache_lock:
+                    self._record_cache[image_id] = record
+            
+            return dict(record)
+            
         except Exception as e:
             if "Image not found" in str(e):
                 raise Exception(f"Image ID '{image_id}' not found on blockchain")
@@ -230,7 +708,7 @@ class BlockchainClient:
             if not self.contract:
                 raise Exception("Contract not configured")
             
-            user_address = Web3.to_checksum_address(user_address)
+            user_address = _checksum(user_address)
             result = self.contract.functions.getUserImages(user_address).call()
             
             return result
@@ -244,7 +722,7 @@ class BlockchainClient:
             if not self.contract:
                 raise Exception("Contract not configured")
             
-            user_address = Web3.to_checksum_address(user_address)
+            user_address = _checksum(user_address)
             result = self.contract.functions.verifyImageOwnership(image_id, user_address).call()
             
             return result
@@ -0,0 +1,23 @@
+"""Gunicorn settings for serving the backend in production
+
+Run from the backend directory: ``gunicorn wsgi:app``
+"""
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+
+# Every route waits on IPFS or the blockchain, so threaded workers let one
+# process keep many requests in flight. Green-thread workers (gevent) do not
+# work here: Flask runs async views through asgiref, which cannot share
+# gevent's single event-loop slot between concurrent requests
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '32'))
+
+# Keep a single worker: each process has its own BlockchainClient with its own
+# optimistic nonce counter for the same account, so several workers would hand
+# out duplicate nonces. Only raise this once nonces come from a shared source.
+workers = int(os.getenv('GUNICORN_WORKERS', '1'))
+
+# Wait-mode uploads block until the transaction is mined, for up to
+# RECEIPT_WAIT_TIMEOUT_SECONDS (135s), so allow for that plus the uploads
+timeout = 180
@@ -1,11 +1,22 @@
 import requests
-import json
-from io import BytesIO
+from requests.adapters import HTTPAdapter
+from requests_toolbelt import MultipartEncoder
+import httpx
+import orjson
 import os
+import threading
+from cachetools import TTLCache
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Content is addressed by its hash, so downloads can be cached safely.
+# The cache is sized in bytes and only small files are kept in it
+DOWNLOAD_CACHE_BYTES = 64 * 1024 * 1024
+DOWNLOAD_CACHE_TTL_SECONDS = 3600
+MAX_CACHED_FILE_SIZE = 4 * 1024 * 1024
+
 
 class IPFSClient:
     def __init__(self, host=None, port=None):
@@ -30,11 +41,23 @@ class IPFSClient:
             self.auth = None
             print(f"🔌 IPFS configured to use local API: {self.api_url}")
 
+        # Reuse connections across calls (keep-alive + pooling)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.auth = self.auth
+
+        self._download_cache = TTLCache(
+            maxsize=DOWNLOAD_CACHE_BYTES, ttl=DOWNLOAD_CACHE_TTL_SECONDS, getsizeof=len
+        )
+        self._download_cache_lock = threading.RLock()
+
         self.client = None
 
         try:
             # Test connection using HTTP API
-            response = requests.post(f"{self.api_url}/version", timeout=5, auth=self.auth)
+            response = self.session.post(f"{self.api_url}/version", timeout=5, auth=self.auth)
             if response.status_code == 200:
                 print("✅ IPFS client initialized (HTTP API)")
                 self.client = True
@@ -49,11 +72,73 @@ class IPFSClient:
         """Check IPFS connection"""
         try:
             # Always attempt to call the /version endpoint so the client can detect a daemon
-            response = requests.post(f"{self.api_url}/version", timeout=5, auth=self.auth)
+            response = self.session.post(f"{self.api_url}/version", timeout=5)
             return response.status_code == 200
         except Exception:
             return False
 
+    def async_client(self):
+        """Create an async HTTP client for the IPFS API.
+
+        Flask runs each async view in its own event loop, so callers open one
+        client per request and pass it to every ``*_async`` call to share the
+        connection pool.
+        """
+        return httpx.AsyncClient(base_url=self.api_url, timeout=60, auth=self.auth)
+
+    @asynccontextmanager
+    async def _async_session(self, client=None):
+        """Yield the given async client, or a short-lived one if none was passed"""
+        if client is not None:
+            yield client
+            return
+
+        async with self.async_client() as owned_client:
+            yield owned_client
+
+    async def _ensure_connected_async(self, client):
+        """Async counterpart of the lazy connection re-check in upload/download"""
+        if self.client:
+            return
+
+        try:
+            response = await client.post('/version', timeout=5)
+            connected = response.status_code == 200
+        except Exception:
+            connected = False
+
+        if not connected:
+            raise Exception("IPFS client not connected")
+        self.client = True
+
+    def _get_cached_file(self, hash_value):
+        with self._download_cache_lock:
+            return self._download_cache.get(hash_value)
+
+    def _cache_file(self, hash_value, file_data):
+        if len(file_data) <= MAX_CACHED_FILE_SIZE:
+            with self._download_cache_lock:
+                self._download_cache[hash_value] = file_data
+
+    def _parse_add_response(self, response):
+        """Extract the content hash from an /add response (requests or httpx)"""
+        if response.status_code == 200:
+            # Infura may return JSON array or object; handle both
+            try:
+                result = orjson.loads(response.content)
+            except orjson.JSONDecodeError:
+                # Some gateways stream newline separated JSON; take first line
+                result = orjson.loads(response.content.splitlines()[0])
+
+            hash_value = result.get('Hash') or result.get('Cid') or result.get('hash')
+            if not hash_value:
+                raise Exception(f"Unexpected response from IPFS add: {result}")
+
+            print(f"✅ File uploaded to IPFS: {hash_value}")
+            return hash_value
+        else:
+            raise Exception(f"Upload failed with status {response.status_code}: {response.text}")
+
     def upload_file(self, file_data, filename):
         """Upload file to IPFS"""
         try:
@@ -66,27 +151,15 @@ class IPFSClient:
 
             print(f"📤 Uploading to IPFS: {filename}")
 
-            # Upload file using HTTP API (supports Infura or local node)
-            files = {'file': (filename, BytesIO(file_data))}
-            response = requests.post(f"{self.api_url}/add", files=files, timeout=60, auth=self.auth)
+            # Upload file using HTTP API (supports Infura or local node);
+            # the multipart body is streamed from file_data rather than copied
+            encoder = MultipartEncoder(fields={'file': (filename, file_data, 'application/octet-stream')})
+            response = self.session.post(
+                f"{self.api_url}/add", data=encoder,
+                headers={'Content-Type': encoder.content_type}, timeout=60
+            )
 
-            if response.status_code == 200:
-                # Infura may return JSON array or object; handle both
-                try:
-                    result = response.json()
-                except Exception:
-                    # Some gateways stream newline separated JSON; take first line
-                    content = response.content.decode('utf-8').splitlines()[0]
-                    result = json.loads(content)
-
-                hash_value = result.get('Hash') or result.get('Cid') or result.get('hash')
-                if not hash_value:
-                    raise Exception(f"Unexpected response from IPFS add: {result}")
-
-                print(f"✅ File uploaded to IPFS: {hash_value}")
-                return hash_value
-            else:
-                raise Exception(f"Upload failed with status {response.status_code}: {response.text}")
+            return self._parse_add_response(response)
 
         except Exception as e:
             raise Exception(f"IPFS upload failed: {str(e)}")
@@ -95,11 +168,9 @@ class IPFSClient:
         """Upload JSON data to IPFS"""
         try:
             if isinstance(data, dict):
-                json_data = json.dumps(data)
+                json_bytes = orjson.dumps(data)
             else:
-                json_data = data
-
-            json_bytes = json_data.encode('utf-8')
+                json_bytes = data.encode('utf-8')
             return self.upload_file(json_bytes, 'metadata.json')
 
         except Exception as e:
@@ -108,6 +179,10 @@ class IPFSClient:
     def download_file(self, hash_value):
         """Download file from IPFS"""
         try:
+            cached = self._get_cached_file(hash_value)
+            if cached is not None:
+                return cached
+
             # If the daemon was started after the client, re-check availability
             if not self.client:
                 if self.check_connection():
@@ -118,11 +193,14 @@ class IPFSClient:
             print(f"📥 Downloading from IPFS: {hash_value}")
 
             # Download file using HTTP API
-            response = requests.post(f"{self.api_url}/cat", params={'arg': hash_value}, timeout=60, auth=self.auth)
+            response = self.session.post(f"{self.api_url}/cat", params={'arg': hash_value}, timeout=60, stream=True)
 
             if response.status_code == 200:
-                file_data = response.content
+                # Read the body in one go instead of joining iterated chunks
+                with response:
+                    file_data = response.raw.read(decode_content=True)
                 print(f"✅ File downloaded: {len(file_data)} bytes")
+                self._cache_file(hash_value, file_data)
                 return file_data
             else:
                 raise Exception(f"Download failed with status {response.status_code}: {response.text}")
@@ -130,6 +208,95 @@ class IPFSClient:
         except Exception as e:
             raise Exception(f"IPFS download failed: {str(e)}")
 
+    def download_file_stream(self, hash_value, chunk_size=65536):
+        """Download file from IPFS as an iterator of chunks
+
+        The request is made (and its status checked) up front, so errors are
+        raised here rather than halfway through a streamed response.
+        """
+        try:
+            cached = self._get_cached_file(hash_value)
+            if cached is not None:
+                return iter([cached])
+
+            # If the daemon was started after the client, re-check availability
+            if not self.client:
+                if self.check_connection():
+                    self.client = True
+                else:
+                    raise Exception("IPFS client not connected")
+
+            print(f"📥 Streaming from IPFS: {hash_value}")
+
+            response = self.session.post(f"{self.api_url}/cat", params={'arg': hash_value}, timeout=60, stream=True)
+
+            if response.status_code != 200:
+                error_text = response.text
+                response.close()
+                raise Exception(f"Download failed with status {response.status_code}: {error_text}")
+
+            return self._iter_response(response, chunk_size)
+
+        except Exception as e:
+            raise Exception(f"IPFS download failed: {str(e)}")
+
+    def _iter_response(self, response, chunk_size):
+        """Yield a streamed response's body and release the connection afterwards"""
+        with response:
+            yield from response.iter_content(chunk_size)
+
+    async def upload_file_async(self, file_data, filename, client=None):
+        """Upload file to IPFS without blocking the event loop"""
+        try:
+            async with self._async_session(client) as session:
+                await self._ensure_connected_async(session)
+
+                print(f"📤 Uploading to IPFS: {filename}")
+
+                files = {'file': (filename, file_data)}
+                response = await session.post('/add', files=files)
+                return self._parse_add_response(response)
+
+        except Exception as e:
+            raise Exception(f"IPFS upload failed: {str(e)}")
+
+    async def upload_json_async(self, data, client=None):
+        """Upload JSON data to IPFS without blocking the event loop"""
+        try:
+            if isinstance(data, dict):
+                json_bytes = orjson.dumps(data)
+            else:
+                json_bytes = data.encode('utf-8')
+            return await self.upload_file_async(json_bytes, 'metadata.json', client=client)
+
+        except Exception as e:
+            raise Exception(f"JSON upload failed: {str(e)}")
+
+    async def download_file_async(self, hash_value, client=None):
+        """Download file from IPFS without blocking the event loop"""
+        try:
+            cached = self._get_cached_file(hash_value)
+            if cached is not None:
+                return cached
+
+            async with self._async_session(client) as session:
+                await self._ensure_connected_async(session)
+
+                print(f"📥 Downloading from IPFS: {hash_value}")
+
+                response = await session.post('/cat', params={'arg': hash_value})
+
+                if response.status_code == 200:
+                    file_data = response.content
+                    print(f"✅ File downloaded: {len(file_data)} bytes")
+                    self._cache_file(hash_value, file_data)
+                    return file_data
+                else:
+                    raise Exception(f"Download failed with status {response.status_code}: {response.text}")
+
+        except Exception as e:
+            raise Exception(f"IPFS download failed: {str(e)}")
+
 
 def format_file_size(size_bytes):
     """Format file size in human readable format"""
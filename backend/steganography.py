@@ -1,65 +1,162 @@
 from PIL import Image
 import numpy as np
 from Crypto.Cipher import AES
-from Crypto.Protocol.KDF import PBKDF2
-from Crypto.Random import get_random_bytes
 import base64
+import hashlib
 import os
+import struct
+import threading
+from cachetools import LRUCache
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+# Hidden payloads are framed with a 4-byte big-endian length. Lengths stay
+# below 2**24 so the first byte is always zero, which tells framed payloads
+# apart from older images holding delimiter-terminated ASCII text.
+LENGTH_HEADER = struct.Struct('>I')
+MAX_PAYLOAD_BYTES = 2 ** 24 - 1
+
+# Derived AES keys cached per (password, salt); repeated decryptions of the
+# same image skip the 100k PBKDF2 iterations
+KEY_CACHE_SIZE = 128
+
+# zlib level for stego PNGs: LSB noise barely compresses, so level 1 is
+# several times faster than the default 6 for only slightly larger files
+PNG_COMPRESS_LEVEL = 1
+
+try:
+    from numba import njit, prange
+except ImportError:  # Numba is optional; fall back to NumPy
+    njit = None
+
+if njit is not None:
+    @njit(parallel=True, cache=True, boundscheck=False)
+    def _pack_lsb_kernel(flat_img, bits):
+        for i in prange(bits.size):
+            flat_img[i] = (flat_img[i] & 0xFE) | bits[i]
+
+    @njit(parallel=True, cache=True, boundscheck=False)
+    def _extract_lsb_packed_kernel(flat_img):
+        packed = np.empty(flat_img.size // 8, dtype=np.uint8)
+        for j in prange(packed.size):
+            byte = 0
+            for k in range(8):
+                byte = (byte << 1) | (flat_img[j * 8 + k] & 1)
+            packed[j] = byte
+        return packed
+
+    # Compile (or load from the on-disk cache) at import, not on the first request.
+    # Numba specializes on writability: extract_data reads a read-only view of
+    # Pillow's buffer, so that signature is compiled as well
+    _pack_lsb_kernel(np.zeros(8, dtype=np.uint8), np.zeros(8, dtype=np.uint8))
+    _extract_lsb_packed_kernel(np.zeros(8, dtype=np.uint8))
+    _readonly_warmup = np.zeros(8, dtype=np.uint8)
+    _readonly_warmup.flags.writeable = False
+    _extract_lsb_packed_kernel(_readonly_warmup)
+    del _readonly_warmup
+
+    # Numba's default threading layer cannot run parallel kernels from several
+    # threads at once; each kernel already spreads across every core
+    _kernel_lock = threading.Lock()
+
+    def _pack_lsb(flat_img, bits):
+        """Write one bit into the LSB of each leading value of flat_img (in place)"""
+        with _kernel_lock:
+            _pack_lsb_kernel(flat_img, bits)
+
+    def _extract_lsb_packed(flat_img):
+        """Pack the LSBs of flat_img into bytes, 8 values per byte (MSB first)"""
+        with _kernel_lock:
+            return _extract_lsb_packed_kernel(flat_img)
+else:
+    def _pack_lsb(flat_img, bits):
+        """Write one bit into the LSB of each leading value of flat_img (in place)"""
+        head = flat_img[:bits.size]
+        head &= 0xFE
+        head |= bits
+
+    def _extract_lsb_packed(flat_img):
+        """Pack the LSBs of flat_img into bytes, 8 values per byte (MSB first)"""
+        return np.packbits(flat_img[:flat_img.size // 8 * 8] & 1)
 
 class ImageSteganography:
     def __init__(self):
         self.delimiter = '1111111111111110'  # Binary delimiter to mark end of data
+        self.delimiter_bytes = int(self.delimiter, 2).to_bytes(len(self.delimiter) // 8, 'big')
+        
+        # Passwords are only kept as keyed BLAKE2 digests in the cache key
+        self._key_cache = LRUCache(maxsize=KEY_CACHE_SIZE)
+        self._key_cache_lock = threading.Lock()
+        self._key_cache_secret = os.urandom(32)
+    
+    def _open_image(self, image_source):
+        """Open an image from a file path or from raw image bytes"""
+        if isinstance(image_source, (bytes, bytearray)):
+            image_source = BytesIO(image_source)
+        return Image.open(image_source)
     
-    def hide_data(self, image_path, secret_data, password='', output_path=None):
-        """Hide secret data in an image using LSB steganography"""
+    def hide_data(self, image_source, secret_data, password='', output_path=None):
+        """Hide secret data in an image using LSB steganography
+
+        ``image_source`` is a file path or the raw image bytes. For raw bytes
+        without an ``output_path`` the PNG is returned as bytes instead of
+        being written to disk.
+        """
         try:
             # Load image
-            img = Image.open(image_path)
+            img = self._open_image(image_source)
             
             # Convert to RGB if necessary
             if img.mode != 'RGB':
                 img = img.convert('RGB')
             
-            # Encrypt data if password is provided
-            data_to_hide = secret_data
+            # Encrypt data if password is provided (raw ciphertext bytes)
             if password:
-                data_to_hide = self._encrypt_data(secret_data, password)
+                payload = self._encrypt_data(secret_data, password)
+            else:
+                payload = secret_data.encode('utf-8')
+            
+            if len(payload) > MAX_PAYLOAD_BYTES:
+                raise ValueError(f"Secret data too large ({len(payload)} bytes)")
             
-            # Convert data to binary
-            binary_data = ''.join(format(ord(char), '08b') for char in data_to_hide)
-            binary_data += self.delimiter  # Add delimiter
+            # Convert data to bits (length header prepended)
+            framed = LENGTH_HEADER.pack(len(payload)) + payload
+            bits = np.unpackbits(np.frombuffer(framed, dtype=np.uint8))
             
-            # Check if image can hold the data
-            img_array = np.array(img)
+            # Check if image can hold the data (writable copy, modified below).
+            # A C-contiguous uint8 array makes ravel() a view and keeps the
+            # LSB kernels on plain byte lanes that vectorize.
+            img_array = np.array(img, dtype=np.uint8, order='C')
             max_capacity = img_array.size
             
-            if len(binary_data) > max_capacity:
-                raise ValueError(f"Image too small. Need {len(binary_data)} bits, have {max_capacity}")
+            if bits.size > max_capacity:
+                raise ValueError(f"Image too small. Need {bits.size} bits, have {max_capacity}")
             
-            # Flatten image array for easier manipulation
-            flat_img = img_array.flatten()
+            # Flat view of the image array; writes go straight to img_array
+            flat_img = img_array.ravel()
             
             # Hide data in LSBs
-            for i, bit in enumerate(binary_data):
-                if i < len(flat_img):
-                    # Modify LSB
-                    flat_img[i] = (flat_img[i] & 0xFE) | int(bit)
-            
-            # Reshape back to original shape
-            modified_img_array = flat_img.reshape(img_array.shape)
+            _pack_lsb(flat_img, bits)
             
             # Create output image
-            output_img = Image.fromarray(modified_img_array.astype('uint8'))
+            output_img = Image.fromarray(img_array)
+            
+            # In-memory input and no output path: hand back the PNG bytes
+            if output_path is None and isinstance(image_source, (bytes, bytearray)):
+                buffer = BytesIO()
+                output_img.save(buffer, 'PNG', compress_level=PNG_COMPRESS_LEVEL)
+                print(f"✅ Data hidden successfully ({buffer.tell()} bytes)")
+                return buffer.getvalue()
             
             # Use the specified output path or generate one
             if output_path is None:
                 output_path = os.path.join(
-                    os.path.dirname(image_path),
-                    f"stego_{os.path.basename(image_path)}"
+                    os.path.dirname(image_source),
+                    f"stego_{os.path.basename(image_source)}"
                 )
             
             # Save steganographic image
-            output_img.save(output_path, 'PNG')
+            output_img.save(output_path, 'PNG', compress_level=PNG_COMPRESS_LEVEL)
             
             print(f"✅ Data hidden successfully in {output_path}")
             return output_path
@@ -68,52 +165,70 @@ class ImageSteganography:
             print(f"❌ Steganography error: {str(e)}")
             return None
     
-    def extract_data(self, image_path, password=None):
-        """Extract hidden data from steganographic image"""
+    def hide_data_batch(self, jobs):
+        """Hide data in several images concurrently
+
+        ``jobs`` is a list of ``(image_source, secret_data, password, output_path)``
+        tuples; returns the ``hide_data`` result for each job, in order. Image
+        decode/encode, NumPy and key derivation release the GIL, so the
+        threads overlap.
+        """
+        if not jobs:
+            return []
+        with ThreadPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1)) as pool:
+            return list(pool.map(lambda job: self.hide_data(*job), jobs))
+    
+    def extract_data(self, image_source, password=None):
+        """Extract hidden data from steganographic image (file path or raw bytes)"""
         try:
             # Load image
-            img = Image.open(image_path)
+            img = self._open_image(image_source)
             
             # Convert to RGB if necessary
             if img.mode != 'RGB':
                 img = img.convert('RGB')
             
-            # Convert to numpy array and flatten
-            img_array = np.array(img).flatten()
+            # Convert to numpy array (read-only view of the decoded pixels) and flatten
+            img_array = np.ascontiguousarray(img, dtype=np.uint8).ravel()
             
-            # Extract LSBs
-            binary_data = ''
-            for pixel_value in img_array:
-                binary_data += str(pixel_value & 1)
-            
-            # Find delimiter
-            delimiter_index = binary_data.find(self.delimiter)
-            if delimiter_index == -1:
+            # Read only the length header's LSBs first
+            header_bits = 8 * LENGTH_HEADER.size
+            header = _extract_lsb_packed(img_array[:header_bits]).tobytes()
+            if len(header) < LENGTH_HEADER.size:
                 raise ValueError("No hidden data found or data corrupted")
             
-            # Extract actual data (before delimiter)
-            actual_binary_data = binary_data[:delimiter_index]
-            
-            # Convert binary to text
-            if len(actual_binary_data) % 8 != 0:
-                raise ValueError("Invalid data length - not divisible by 8")
-            
-            extracted_text = ''
-            for i in range(0, len(actual_binary_data), 8):
-                byte = actual_binary_data[i:i+8]
-                if len(byte) == 8:
-                    char_code = int(byte, 2)
-                    if 0 <= char_code <= 127:  # Valid ASCII range
-                        extracted_text += chr(char_code)
-                    else:
-                        break  # Invalid character, might be end of data
+            legacy = header[:1] != b'\x00'
+            if legacy:
+                # Older images: base64/plain text terminated by the delimiter,
+                # so the whole LSB stream has to be scanned
+                extracted_bytes = _extract_lsb_packed(img_array).tobytes()
+                delimiter_index = extracted_bytes.find(self.delimiter_bytes)
+                if delimiter_index == -1:
+                    raise ValueError("No hidden data found or data corrupted")
+                payload = extracted_bytes[:delimiter_index]
+            else:
+                # Length-prefixed payload: unpack exactly the bits it occupies
+                (length,) = LENGTH_HEADER.unpack(header)
+                payload_end = header_bits + 8 * length
+                if payload_end > img_array.size:
+                    raise ValueError("No hidden data found or data corrupted")
+                payload = _extract_lsb_packed(img_array[header_bits:payload_end]).tobytes()
             
             # Decrypt if password was used
             if password:
                 try:
-                    extracted_text = self._decrypt_data(extracted_text, password)
+                    if legacy:
+                        payload = base64.b64decode(self._bytes_to_text(payload))
+                    extracted_text = self._decrypt_data(payload, password)
                 except:
                     raise ValueError("Incorrect password or corrupted encrypted data")
+            elif legacy:
+                extracted_text = self._bytes_to_text(payload)
+            else:
+                try:
+                    extracted_text = payload.decode('utf-8')
+                except UnicodeDecodeError:
+                    raise ValueError("Hidden data is not valid text (is it password protected?)")
             
             if not extracted_text:
                 raise ValueError("No valid data could be extracted")
@@ -124,14 +239,39 @@ class ImageSteganography:
         except Exception as e:
             raise Exception(f"Data extraction failed: {str(e)}")
     
+    def _bytes_to_text(self, data):
+        """Decode text from older images as ASCII, stopping at the first invalid character"""
+        if not data.isascii():
+            # Invalid character, might be end of data; keep the ASCII prefix
+            data = data[:np.argmax(np.frombuffer(data, dtype=np.uint8) > 127)]
+        return data.decode('ascii')
+    
+    def _derive_key(self, password, salt):
+        """Derive the AES key for decrypting, reusing cached results
+
+        Only decryption benefits: the same image is often extracted repeatedly,
+        while every encryption uses a fresh salt.
+        """
+        cache_key = (
+            hashlib.blake2b(password.encode('utf-8'), key=self._key_cache_secret).digest(),
+            salt
+        )
+        with self._key_cache_lock:
+            key = self._key_cache.get(cache_key)
+        if key is None:
+            key = _pbkdf2_key(password, salt)
+            with self._key_cache_lock:
+                self._key_cache[cache_key] = key
+        return key
+    
     def _encrypt_data(self, data, password):
-        """Encrypt data using AES encryption"""
+        """Encrypt data using AES encryption; returns salt + nonce + tag + ciphertext"""
         try:
             # Generate salt
-            salt = get_random_bytes(16)
+            salt = os.urandom(16)
             
             # Derive key from password
-            key = PBKDF2(password, salt, 32, count=100000)
+            key = _pbkdf2_key(password, salt)
             
             # Create cipher
             cipher = AES.new(key, AES.MODE_GCM)
@@ -140,21 +280,14 @@ class ImageSteganography:
             ciphertext, tag = cipher.encrypt_and_digest(data.encode('utf-8'))
             
             # Combine salt, nonce, tag, and ciphertext
-            encrypted_data = base64.b64encode(
-                salt + cipher.nonce + tag + ciphertext
-            ).decode('utf-8')
-            
-            return encrypted_data
+            return salt + cipher.nonce + tag + ciphertext
             
         except Exception as e:
             raise Exception(f"Encryption failed: {str(e)}")
     
-    def _decrypt_data(self, encrypted_data, password):
-        """Decrypt AES encrypted data"""
+    def _decrypt_data(self, encrypted_bytes, password):
+        """Decrypt AES encrypted data (salt + nonce + tag + ciphertext)"""
         try:
-            # Decode base64
-            encrypted_bytes = base64.b64decode(encrypted_data.encode('utf-8'))
-            
             # Extract components
             salt = encrypted_bytes[:16]
             nonce = encrypted_bytes[16:32]
@@ -162,7 +295,7 @@ class ImageSteganography:
             ciphertext = encrypted_bytes[48:]
             
             # Derive key from password
-            key = PBKDF2(password, salt, 32, count=100000)
+            key = self._derive_key(password, salt)
             
             # Create cipher and decrypt
             cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
@@ -176,22 +309,36 @@ class ImageSteganography:
     def analyze_image_capacity(self, image_path):
         """Analyze how much data an image can hold"""
         try:
-            img = Image.open(image_path)
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            img_array = np.array(img)
-            total_pixels = img_array.size
+            # Only the header is read; hide_data always embeds into 3 RGB
+            # channels, so the capacity follows from the dimensions alone
+            with Image.open(image_path) as img:
+                width, height = img.size
+            total_pixels = width * height * 3
             
             # Each pixel can hide 1 bit, need 8 bits per character
-            max_chars = (total_pixels - len(self.delimiter)) // 8
+            max_chars = (total_pixels - 8 * LENGTH_HEADER.size) // 8
             
             return {
                 'total_pixels': total_pixels,
                 'max_characters': max_chars,
                 'max_bytes': max_chars,
-                'image_dimensions': img.size
+                'image_dimensions': (width, height)
             }
             
         except Exception as e:
-            raise Exception(f"Image analysis failed: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Image analysis failed: {str(e)}")
+
+def _pbkdf2_key(password, salt):
+    """Derive a 32-byte AES key from a password and salt"""
+    # Same derivation as PyCryptodome's PBKDF2 defaults (HMAC-SHA1, latin-1
+    # password) so existing images keep their keys; passwords outside
+    # latin-1, which it could not encode, are UTF-8 encoded
+    try:
+        password_bytes = password.encode('latin-1')
+    except UnicodeEncodeError:
+        password_bytes = password.encode('utf-8')
+    return hashlib.pbkdf2_hmac('sha1', password_bytes, salt, 100000, dklen=32)
+
+def hide_data_worker(image_bytes, secret_data, password=''):
+    """Hide data in raw image bytes and return the PNG bytes (process pool entry point)"""
+    return ImageSteganography().hide_data(image_bytes, secret_data, password)
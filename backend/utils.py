@@ -8,6 +8,20 @@ from werkzeug.utils import secure_filename
 # Allowed file extensions for image uploads
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tiff', 'webp'}
 
+# Image ID pattern: IMG-{timestamp}-{16_character_hex}
+_IMAGE_ID_RE = re.compile(r'IMG-[0-9]{10}-[a-f0-9]{16}')
+
+# Control characters (except tab/newline/carriage return) removed by sanitize_input
+_SANITIZE_TABLE = dict.fromkeys(
+    [code for code in range(32) if chr(code) not in '\t\n\r'] + [127]
+)
+
+# Read size when hashing files without hashlib.file_digest
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Content rejected in secret data
+_DANGEROUS_RE = re.compile(r'<script|javascript:|data:|vbscript:', re.IGNORECASE)
+
 def allowed_file(filename):
     """
     Check if the uploaded file has an allowed extension.
@@ -22,7 +36,7 @@ def allowed_file(filename):
         return False
     
     # Get file extension
-    file_extension = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+    file_extension = os.path.splitext(filename)[1][1:].lower()
     
     return file_extension in ALLOWED_EXTENSIONS
 
@@ -50,9 +64,7 @@ def validate_image_id(image_id):
     if not image_id or not isinstance(image_id, str):
         return False
     
-    # Pattern: IMG-{timestamp}-{8_character_hex}
-    pattern = r'^IMG-\d{10}-[a-f0-9]{16}$'
-    return bool(re.match(pattern, image_id))
+    return _IMAGE_ID_RE.fullmatch(image_id) is not None
 
 def secure_filename_custom(filename):
     """
@@ -77,11 +89,19 @@ def generate_file_hash(file_path):
         str: SHA-256 hash of the file
     """
     try:
-        hash_sha256 = hashlib.sha256()
         with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_sha256.update(chunk)
-        return hash_sha256.hexdigest()
+            if hasattr(hashlib, 'file_digest'):  # Python 3.11+
+                return hashlib.file_digest(f, 'sha256').hexdigest()
+            
+            # Reuse one buffer instead of allocating a chunk per read
+            hash_sha256 = hashlib.sha256()
+            buffer = memoryview(bytearray(HASH_CHUNK_SIZE))
+            while True:
+                n = f.readinto(buffer)
+                if not n:
+                    break
+                hash_sha256.update(buffer[:n])
+            return hash_sha256.hexdigest()
     except Exception as e:
         raise Exception(f"Failed to generate file hash: {str(e)}")
 
@@ -102,9 +122,35 @@ def validate_ethereum_address(address):
     if not address.startswith('0x') or len(address) != 42:
         return False
     
-    # Check if remaining characters are valid hex
-    hex_part = address[2:]
-    return all(c in '0123456789abcdefABCDEF' for c in hex_part)
+    # Check if remaining characters are valid hex; fromhex skips whitespace,
+    # so also require the full 20 bytes
+    try:
+        return len(bytes.fromhex(address[2:])) == 20
+    except ValueError:
+        return False
+
+def validate_transaction_hash(tx_hash):
+    """
+    Validate transaction hash format.
+    
+    Args:
+        tx_hash (str): Transaction hash, with or without the 0x prefix
+        
+    Returns:
+        bool: True if the hash format is valid, False otherwise
+    """
+    if not tx_hash or not isinstance(tx_hash, str):
+        return False
+    
+    hex_part = tx_hash[2:] if tx_hash.startswith('0x') else tx_hash
+    if len(hex_part) != 64:
+        return False
+    
+    # fromhex skips whitespace, so also require the full 32 bytes
+    try:
+        return len(bytes.fromhex(hex_part)) == 32
+    except ValueError:
+        return False
 
 def format_timestamp(timestamp):
     """
@@ -157,12 +203,8 @@ def validate_secret_data(data):
         return False, "Secret data is too large (max 10KB)"
     
     # Check for potentially dangerous content
-    dangerous_patterns = ['<script', 'javascript:', 'data:', 'vbscript:']
-    data_lower = data.lower()
-    
-    for pattern in dangerous_patterns:
-        if pattern in data_lower:
-            return False, "Secret data contains potentially dangerous content"
+    if _DANGEROUS_RE.search(data):
+        return False, "Secret data contains potentially dangerous content"
     
     return True, None
 
@@ -225,7 +267,7 @@ def sanitize_input(text, max_length=1000):
         return ""
     
     # Remove null bytes and control characters
-    sanitized = ''.join(char for char in text if ord(char) >= 32 or char in '\t\n\r')
+    sanitized = text.translate(_SANITIZE_TABLE)
     
     # Limit length
     if len(sanitized) > max_length:
@@ -0,0 +1,2 @@
+"""WSGI entrypoint for production servers (see gunicorn.conf.py)"""
+from app import app
@@ -40,6 +40,21 @@ contract SteganographyRegistry {
         emit ImageStored(imageId, ipfsHash, metadataHash, msg.sender);
     }
     
+    function storeImageRecordBatch(
+        string[] memory imageIds,
+        string[] memory ipfsHashes,
+        string[] memory metadataHashes
+    ) public {
+        require(
+            imageIds.length == ipfsHashes.length && imageIds.length == metadataHashes.length,
+            "Array length mismatch"
+        );
+        
+        for (uint256 i = 0; i < imageIds.length; i++) {
+            storeImageRecord(imageIds[i], ipfsHashes[i], metadataHashes[i]);
+        }
+    }
+    
     function getImageRecord(string memory imageId) 
         public view returns (ImageRecord memory) {
         require(imageRecords[imageId].exists, "Image not found");
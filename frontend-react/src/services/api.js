@@ -44,6 +44,14 @@ export async function getUserImages(address){
   return request(`/api/user-images/${address}`);
 }
 
+export async function getTransactionStatus(txHash){
+  return request(`/api/tx/${txHash}`);
+}
+
+export async function getRecordStatus(imageId){
+  return request(`/api/status/${imageId}`);
+}
+
 export async function downloadImage(imageId){
   const res = await fetch(API_BASE + `/api/download/${imageId}`);
   if(!res.ok){